@@ -3,17 +3,28 @@
 FastAPI backend for earthquake data API
 """
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
-import glob
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 import os
-import json
-import csv
-from datetime import datetime
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
-app = FastAPI(title="Earthquake Sequence Mining API")
+import numpy as np
+import orjson
+import pandas as pd
+from dateutil.tz import tzlocal
+
+
+class ORJSONResponse(JSONResponse):
+    """JSON response serialized with orjson"""
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY)
+
+
+app = FastAPI(title="Earthquake Sequence Mining API", default_response_class=ORJSONResponse)
 
 # Enable CORS for frontend
 app.add_middleware(
@@ -27,147 +38,226 @@ app.add_middleware(
 DATA_DIR = os.path.join(os.path.dirname(__file__), "..", "data")
 CSV_PATH = os.path.join(os.path.dirname(__file__), "..", "data_summary.csv")
 
+READ_WORKERS = 32
+YEAR_WORKERS = 4
+API_WORKERS = 4
+STREAM_ROWS = 50000
+EVENT_COLUMNS = ['time', 'place', 'mag', 'depth', 'lat', 'lon']
 
-def get_available_years() -> list[str]:
-    """Get list of years that have data"""
+# Chart buckets: each edge starts a new range
+MAG_EDGES = [3, 5, 7]
+MAG_LABELS = ['0-3', '3-5', '5-7', '7+']
+DEPTH_EDGES = [50, 100, 300]
+DEPTH_LABELS = ['0-50km', '50-100km', '100-300km', '300km+']
+
+# In-process results keyed by name -> (data signature, value)
+_CACHE = {}
+
+
+def year_dirs() -> list:
+    """Year directories in DATA_DIR as DirEntry objects, sorted by name"""
     if not os.path.exists(DATA_DIR):
         return []
-    years = []
-    for item in sorted(os.listdir(DATA_DIR)):
-        year_path = os.path.join(DATA_DIR, item)
-        if os.path.isdir(year_path) and item.isdigit():
-            json_files = glob.glob(os.path.join(year_path, "event_*.json"))
-            if json_files:
-                years.append(item)
-    return years
+    with os.scandir(DATA_DIR) as it:
+        entries = [e for e in it if e.name.isdigit() and e.is_dir()]
+    return sorted(entries, key=lambda e: e.name)
 
 
-def read_year_data(year: str) -> list:
-    """Read earthquake data for a specific year from JSON files"""
+def iter_event_files(year_path: str):
+    """Yield the paths of event_*.json files in a year directory"""
+    try:
+        it = os.scandir(year_path)
+    except OSError:
+        return
+    with it:
+        for entry in it:
+            if entry.name.startswith('event_') and entry.name.endswith('.json'):
+                yield entry.path
+
+
+def data_signature() -> tuple:
+    """Modification times of the year directories"""
+    return tuple((e.name, e.stat().st_mtime_ns) for e in year_dirs())
+
+
+def cached(key: str, compute):
+    """Return the cached value for key, recomputing it when the data changed"""
+    signature = data_signature()
+    hit = _CACHE.get(key)
+    if hit is not None and hit[0] == signature:
+        return hit[1]
+    value = compute()
+    _CACHE[key] = (signature, value)
+    return value
+
+
+def get_available_years() -> list[str]:
+    """Get list of years that have data"""
+    return [e.name for e in year_dirs() if any(iter_event_files(e.path))]
+
+
+def _parse_event_file(json_file: str) -> tuple | None:
+    """Read one event JSON file and extract the fields served by the API"""
+    try:
+        with open(json_file, 'rb') as f:
+            data = orjson.loads(f.read())
+
+        # Extract feature from GeoJSON
+        if "features" in data and data["features"]:
+            feature = data["features"][0]
+        elif data.get("type") == "Feature":
+            feature = data
+        else:
+            return None
+
+        props = feature["properties"]
+        coords = feature.get("geometry", {}).get("coordinates", [0, 0, 0])
+
+        return (
+            props.get("time", 0),
+            props.get('place'),
+            props.get('mag'),
+            coords[2] if len(coords) > 2 else None,
+            coords[1] if len(coords) > 1 else None,
+            coords[0] if len(coords) > 0 else None,
+        )
+
+    except Exception:
+        return None
+
+
+def year_cache_path(year: str) -> str:
+    """Path of the parquet cache built from a year's JSON files"""
+    return os.path.join(DATA_DIR, f"{year}.parquet")
+
+
+def events_frame(rows: list) -> pd.DataFrame:
+    """Build a typed events DataFrame sorted by time (UTC) from raw field tuples"""
+    df = pd.DataFrame.from_records(rows, columns=EVENT_COLUMNS)
+
+    # Parse time (Unix timestamp in milliseconds), drop unparseable
+    time_ms = pd.to_numeric(df['time'], errors='coerce')
+    df['time'] = pd.to_datetime(time_ms, unit='ms', utc=True, errors='coerce')
+    for col in ('mag', 'depth', 'lat', 'lon'):
+        df[col] = pd.to_numeric(df[col], errors='coerce')
+
+    # Stable sort keeps events with equal times in file order, like list.sort did
+    return df.dropna(subset=['time']).sort_values('time', kind='mergesort', ignore_index=True)
+
+
+def build_year_frame(year: str) -> pd.DataFrame:
+    """Parse a year's JSON files into a DataFrame sorted by time (UTC)"""
     year_path = os.path.join(DATA_DIR, year)
-    json_files = glob.glob(os.path.join(year_path, "event_*.json"))
-    if not json_files:
-        return []
+    json_files = list(iter_event_files(year_path))
 
-    events = []
-    for json_file in json_files:
-        try:
-            with open(json_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-
-            # Extract feature from GeoJSON
-            if "features" in data and data["features"]:
-                feature = data["features"][0]
-            elif data.get("type") == "Feature":
-                feature = data
-            else:
-                continue
-
-            props = feature["properties"]
-            coords = feature.get("geometry", {}).get("coordinates", [0, 0, 0])
-
-            # Parse time (Unix timestamp in milliseconds)
-            time_ms = props.get("time", 0)
+    # Overlap the many small file reads across threads
+    with ThreadPoolExecutor(max_workers=READ_WORKERS) as executor:
+        rows = [row for row in executor.map(_parse_event_file, json_files) if row is not None]
+
+    return events_frame(rows)
+
+
+def load_year_frame(year: str) -> pd.DataFrame:
+    """Load earthquake events for a year, using the parquet cache when it is fresh"""
+    year_path = os.path.join(DATA_DIR, year)
+    if not (year.isdigit() and os.path.isdir(year_path)):
+        df = build_year_frame(year)
+    else:
+        cache_path = year_cache_path(year)
+        year_mtime = os.stat(year_path).st_mtime_ns
+        if os.path.exists(cache_path) and os.stat(cache_path).st_mtime_ns >= year_mtime:
+            df = pd.read_parquet(cache_path, columns=EVENT_COLUMNS)
+        else:
+            df = build_year_frame(year)
+            # Stamp the cache with the directory mtime seen before the scan,
+            # so files added while building still invalidate it
+            tmp_path = f"{cache_path}.{os.getpid()}.tmp"
             try:
-                time_obj = datetime.fromtimestamp(time_ms / 1000)
-            except:
-                continue
-
-            mag = props.get('mag')
-            depth = coords[2] if len(coords) > 2 else None
-            lat = coords[1] if len(coords) > 1 else None
-            lon = coords[0] if len(coords) > 0 else None
-
-            event = {
-                'time': time_obj,
-                'place': props.get('place') or '--',
-                'mag': mag if mag is not None else '--',
-                'depth': depth if depth is not None else '--',
-                'lat': lat if lat is not None else '--',
-                'lon': lon if lon is not None else '--',
-            }
-            events.append(event)
-
-        except Exception:
-            continue
-
-    # Sort by datetime BEFORE formatting
-    events.sort(key=lambda x: x['time'])
-
-    # Format time after sorting
-    for event in events:
-        event['time'] = event['time'].strftime('%d/%m/%Y %H:%M:%S')
-
-    return events
-
-
-def calculate_stats(data: list) -> dict:
-    """Calculate statistics from data"""
-    # Filter out '--' and None values, convert to float
-    mags = []
-    depths = []
-    for d in data:
-        mag = d.get('mag')
-        depth = d.get('depth')
-        if isinstance(mag, (int, float)) and mag > 0:
-            mags.append(mag)
-        if isinstance(depth, (int, float)) and depth > 0:
-            depths.append(depth)
+                df.to_parquet(tmp_path, compression='zstd', index=False)
+                os.utime(tmp_path, ns=(year_mtime, year_mtime))
+                os.replace(tmp_path, cache_path)
+            except OSError:
+                pass
 
-    stats = {
-        'total_events': len(data),
-        'avg_mag': round(sum(mags) / len(mags), 1) if mags else 0,
-        'max_mag': round(max(mags), 1) if mags else 0,
-        'avg_depth': round(sum(depths) / len(depths), 1) if depths else 0,
-    }
-    return stats
+    # Times are displayed in local time. Convert once to naive wall-clock time:
+    # field access (.dt.month, strftime) on a dateutil-tz column runs per element
+    df['time'] = df['time'].dt.tz_convert(tzlocal()).dt.tz_localize(None)
+    return df
 
 
-def calculate_charts(data: list) -> dict:
-    """Calculate chart data from data"""
-    mag_ranges = {'0-3': 0, '3-5': 0, '5-7': 0, '7+': 0}
-    depth_ranges = {'0-50km': 0, '50-100km': 0, '100-300km': 0, '300km+': 0}
-    month_counts = [0] * 12
-
-    for d in data:
-        # Magnitude ranges (skip '--')
-        mag = d['mag']
-        if isinstance(mag, (int, float)):
-            if mag < 3:
-                mag_ranges['0-3'] += 1
-            elif mag < 5:
-                mag_ranges['3-5'] += 1
-            elif mag < 7:
-                mag_ranges['5-7'] += 1
-            else:
-                mag_ranges['7+'] += 1
-
-        # Depth ranges (skip '--')
-        depth = d['depth']
-        if isinstance(depth, (int, float)):
-            if depth < 50:
-                depth_ranges['0-50km'] += 1
-            elif depth < 100:
-                depth_ranges['50-100km'] += 1
-            elif depth < 300:
-                depth_ranges['100-300km'] += 1
-            else:
-                depth_ranges['300km+'] += 1
-
-        # Month counts
-        try:
-            time_obj = datetime.strptime(d['time'], '%d/%m/%Y %H:%M:%S')
-            month_counts[time_obj.month - 1] += 1
-        except:
-            pass
+def records(df: pd.DataFrame) -> list:
+    """Rows of a frame as dicts, zipped from whole-column lists instead of per-row boxing"""
+    columns = list(df.columns)
+    return [dict(zip(columns, row)) for row in zip(*(df[col].tolist() for col in columns))]
+
+
+def frame_to_records(df: pd.DataFrame) -> list:
+    """Format a year frame as the list of event dicts served by the API"""
+    # Null/unknown values are served as '--'
+    events = pd.DataFrame({
+        'time': df['time'].dt.strftime('%d/%m/%Y %H:%M:%S'),
+        'place': df['place'].where(df['place'].notna() & (df['place'] != ''), '--'),
+    })
+    for col in ('mag', 'depth', 'lat', 'lon'):
+        events[col] = df[col].astype(object).where(df[col].notna(), '--')
+
+    return records(events)
+
+
+def read_year_data(year: str) -> list:
+    """Read earthquake data for a specific year from JSON files"""
+    return frame_to_records(load_year_frame(year))
+
+
+def calculate_stats(df: pd.DataFrame) -> dict:
+    """Calculate statistics from a year frame"""
+    return combine_aggregates([year_aggregates(df)])
+
+
+def bucket_counts(values: np.ndarray, edges: list) -> list:
+    """Count values into [edge, next edge) buckets, open-ended on both sides"""
+    values = values[~np.isnan(values)]
+    buckets = np.searchsorted(edges, values, side='right')
+    return np.bincount(buckets, minlength=len(edges) + 1).tolist()
+
+
+def calculate_charts(df: pd.DataFrame) -> dict:
+    """Calculate chart data from a year frame"""
+    mag_counts = bucket_counts(df['mag'].to_numpy(), MAG_EDGES)
+    depth_counts = bucket_counts(df['depth'].to_numpy(), DEPTH_EDGES)
+    month_counts = np.bincount(df['time'].dt.month.to_numpy() - 1, minlength=12)
 
     return {
-        'mag_ranges': mag_ranges,
-        'depth_ranges': depth_ranges,
-        'month_counts': month_counts
+        'mag_ranges': dict(zip(MAG_LABELS, mag_counts)),
+        'depth_ranges': dict(zip(DEPTH_LABELS, depth_counts)),
+        'month_counts': month_counts.tolist()
     }
 
 
+def iter_year_frames(years):
+    """Load year frames in order, at most YEAR_WORKERS ahead of the consumer"""
+    with ThreadPoolExecutor(max_workers=YEAR_WORKERS) as executor:
+        pending = deque()
+        for year in years:
+            pending.append(executor.submit(load_year_frame, year))
+            if len(pending) > YEAR_WORKERS:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def stream_records(frames):
+    """Yield events frames as one JSON array of records, STREAM_ROWS at a time"""
+    yield b'['
+    first = True
+    for df in frames:
+        for start in range(0, len(df), STREAM_ROWS):
+            chunk = orjson.dumps(frame_to_records(df.iloc[start:start + STREAM_ROWS]))
+            yield (b'' if first else b',') + chunk[1:-1]
+            first = False
+    yield b']'
+
+
 @app.get("/")
 def read_root():
     return {"message": "Earthquake Sequence Mining API", "docs": "/docs"}
@@ -176,89 +266,152 @@ def read_root():
 @app.get("/api/years")
 def get_years():
     """Get all available years"""
-    return {"years": get_available_years()}
+    return {"years": cached('years', get_available_years)}
 
 
 @app.get("/api/data/{year}")
-def get_year_data(year: str):
+def get_year_data(year: str, request: Request):
     """Get earthquake data for a specific year with stats and charts"""
-    data = read_year_data(year)
+    # The response only changes when the year directory does
+    headers = {}
+    year_path = os.path.join(DATA_DIR, year)
+    if year.isdigit() and os.path.isdir(year_path):
+        headers['ETag'] = f'W/"{year}-{os.stat(year_path).st_mtime_ns:x}"'
+        if request.headers.get('if-none-match') == headers['ETag']:
+            return Response(status_code=304, headers=headers)
 
-    return {
+    df = load_year_frame(year)
+    data = frame_to_records(df)
+
+    # Returned directly so FastAPI skips jsonable_encoder on every event
+    return ORJSONResponse({
         "year": year,
         "count": len(data),
         "data": data,
-        "stats": calculate_stats(data),
-        "charts": calculate_charts(data)
-    }
+        "stats": calculate_stats(df),
+        "charts": calculate_charts(df)
+    }, headers=headers)
 
 
-@app.get("/api/stats")
-def get_stats():
-    """Get overall statistics from all data"""
-    all_events = []
-    all_mags = []
-    all_depths = []
+def stats_cache_path() -> str:
+    """Path of the persisted per-year aggregates used by /api/stats"""
+    return os.path.join(DATA_DIR, ".stats_cache.json")
 
-    for year in get_available_years():
-        events = read_year_data(year)
-        all_events.extend(events)
-        for e in events:
-            mag = e['mag']
-            depth = e['depth']
-            if isinstance(mag, (int, float)) and mag > 0:
-                all_mags.append(mag)
-            if isinstance(depth, (int, float)) and depth > 0:
-                all_depths.append(depth)
+
+def year_aggregates(df: pd.DataFrame) -> dict:
+    """Reduce a year frame to scalars that can be combined across years"""
+    # Unknown (NaN) and non-positive values are excluded
+    mags = df['mag'].to_numpy()
+    mags = mags[mags > 0]
+    depths = df['depth'].to_numpy()
+    depths = depths[depths > 0]
+
+    return {
+        'total_events': len(df),
+        'mag_sum': float(mags.sum()),
+        'mag_count': int(mags.size),
+        'mag_max': float(mags.max()) if mags.size else 0.0,
+        'depth_sum': float(depths.sum()),
+        'depth_count': int(depths.size),
+    }
+
+
+def combine_aggregates(values) -> dict:
+    """Turn per-year aggregates into the stats payload"""
+    values = list(values)
+    mag_count = sum(a['mag_count'] for a in values)
+    depth_count = sum(a['depth_count'] for a in values)
 
     stats = {
-        'total_events': len(all_events),
-        'avg_mag': round(sum(all_mags) / len(all_mags), 1) if all_mags else 0,
-        'max_mag': round(max(all_mags), 1) if all_mags else 0,
-        'avg_depth': round(sum(all_depths) / len(all_depths), 1) if all_depths else 0,
+        'total_events': sum(a['total_events'] for a in values),
+        'avg_mag': round(sum(a['mag_sum'] for a in values) / mag_count, 1) if mag_count else 0,
+        'max_mag': round(max(a['mag_max'] for a in values), 1) if mag_count else 0,
+        'avg_depth': round(sum(a['depth_sum'] for a in values) / depth_count, 1) if depth_count else 0,
     }
     return stats
 
 
-@app.get("/api/all")
-def get_all_data():
-    """Get all earthquake data from all years"""
-    all_events = []
-    all_mags = []
-    all_depths = []
-    year_ranges = {'0-3': 0, '3-5': 0, '5-7': 0, '7+': 0}
+def compute_overall_stats() -> dict:
+    """Calculate statistics across all years"""
+    try:
+        with open(stats_cache_path(), 'rb') as f:
+            cached_aggregates = orjson.loads(f.read())
+    except (OSError, orjson.JSONDecodeError):
+        cached_aggregates = {}
 
+    # Reuse aggregates of years whose directory has not changed
+    aggregates = {}
+    stale = {}
     for year in get_available_years():
-        events = read_year_data(year)
-        all_events.extend(events)
-        for e in events:
-            mag = e['mag']
-            depth = e['depth']
-            if isinstance(mag, (int, float)):
-                all_mags.append(mag)
-                if mag < 3:
-                    year_ranges['0-3'] += 1
-                elif mag < 5:
-                    year_ranges['3-5'] += 1
-                elif mag < 7:
-                    year_ranges['5-7'] += 1
-                else:
-                    year_ranges['7+'] += 1
-            if isinstance(depth, (int, float)):
-                all_depths.append(depth)
+        mtime = os.stat(os.path.join(DATA_DIR, year)).st_mtime_ns
+        hit = cached_aggregates.get(year)
+        if hit is not None and hit['mtime_ns'] == mtime:
+            aggregates[year] = hit
+        else:
+            stale[year] = mtime
+
+    # Load stale years concurrently
+    with ThreadPoolExecutor(max_workers=YEAR_WORKERS) as executor:
+        for year, df in zip(stale, executor.map(load_year_frame, stale)):
+            aggregates[year] = {'mtime_ns': stale[year], **year_aggregates(df)}
+
+    if aggregates != cached_aggregates:
+        tmp_path = f"{stats_cache_path()}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(orjson.dumps(aggregates))
+            os.replace(tmp_path, stats_cache_path())
+        except OSError:
+            pass
 
-    return {
-        "count": len(all_events),
-        "data": all_events,
-        "stats": {
-            'total_events': len(all_events),
-            'avg_mag': round(sum(all_mags) / len(all_mags), 1) if all_mags else 0,
-            'max_mag': round(max(all_mags), 1) if all_mags else 0,
-            'min_mag': round(min(all_mags), 1) if all_mags else 0,
-            'avg_depth': round(sum(all_depths) / len(all_depths), 1) if all_depths else 0,
-            'mag_ranges': year_ranges,
+    return combine_aggregates(aggregates.values())
+
+
+@app.get("/api/stats")
+def get_stats():
+    """Get overall statistics from all data"""
+    return cached('stats', compute_overall_stats)
+
+
+@app.get("/api/all")
+def get_all_data():
+    """Get all earthquake data from all years"""
+    # Same frame pipeline as the per-year endpoint, streamed one year at a time
+    # with running totals, so only a few year frames are in memory at once
+    totals = {'count': 0, 'mag_sum': 0.0, 'mag_count': 0, 'mag_max': -np.inf, 'mag_min': np.inf,
+              'depth_sum': 0.0, 'depth_count': 0, 'mag_buckets': np.zeros(len(MAG_EDGES) + 1, dtype=np.int64)}
+
+    def tally(frames):
+        for df in frames:
+            mags = df['mag'].dropna().to_numpy()
+            depths = df['depth'].dropna().to_numpy()
+            totals['count'] += len(df)
+            totals['mag_sum'] += float(mags.sum())
+            totals['mag_count'] += mags.size
+            if mags.size:
+                totals['mag_max'] = max(totals['mag_max'], float(mags.max()))
+                totals['mag_min'] = min(totals['mag_min'], float(mags.min()))
+            totals['depth_sum'] += float(depths.sum())
+            totals['depth_count'] += depths.size
+            totals['mag_buckets'] += bucket_counts(mags, MAG_EDGES)
+            yield df
+
+    def body():
+        yield b'{"data":'
+        yield from stream_records(tally(iter_year_frames(get_available_years())))
+
+        mag_count, depth_count = totals['mag_count'], totals['depth_count']
+        stats = {
+            'total_events': totals['count'],
+            'avg_mag': round(totals['mag_sum'] / mag_count, 1) if mag_count else 0,
+            'max_mag': round(totals['mag_max'], 1) if mag_count else 0,
+            'min_mag': round(totals['mag_min'], 1) if mag_count else 0,
+            'avg_depth': round(totals['depth_sum'] / depth_count, 1) if depth_count else 0,
+            'mag_ranges': dict(zip(MAG_LABELS, totals['mag_buckets'].tolist())),
         }
-    }
+        yield b',"count":%d,"stats":' % totals['count'] + orjson.dumps(stats) + b'}'
+
+    return StreamingResponse(body(), media_type="application/json")
 
 
 @app.get("/api/summary")
@@ -267,21 +420,18 @@ def get_summary_data():
     if not os.path.exists(CSV_PATH):
         return {"error": "CSV file not found. Run: python aggregate_data.py"}
 
-    data = []
-    with open(CSV_PATH, 'r', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            row['mag'] = float(row['mag'])
-            row['depth'] = float(row['depth'])
-            row['year'] = int(row['year']) if row['year'] else None
-            row['month'] = int(row['month']) if row['month'] else None
-            row['lat'] = float(row['lat'])
-            row['lon'] = float(row['lon'])
-            data.append(row)
+    df = pd.read_csv(CSV_PATH, engine='pyarrow', dtype=str, keep_default_na=False)
+    for col in ('mag', 'depth', 'lat', 'lon'):
+        df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0.0)
+    for col in ('year', 'month'):
+        df[col] = pd.to_numeric(df[col], errors='coerce').astype('Int64')
+
+    # Missing year/month become None in the JSON output
+    data = records(df.astype(object).where(df.notna(), None))
 
-    return {"data": data, "count": len(data)}
+    return ORJSONResponse({"data": data, "count": len(data)})
 
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="127.0.0.1", port=8386)
+    uvicorn.run("api:app", host="127.0.0.1", port=8386, workers=API_WORKERS)
@@ -10,24 +10,119 @@ Usage:
 """
 
 import os
+import re
 import sys
 import glob
 import argparse
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import time
-import json
-import csv
-from io import StringIO
+import random
+import threading
+import orjson
 from collections import defaultdict
+from email.utils import parsedate_to_datetime
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from itertools import repeat
 
 # CẤU HÌNH DELAY (giây)
-CRAWL_DELAY = 0.8          # Delay khi crawl mỗi event (giảm để tăng tốc độ)
-FETCH_DELAY = 0.5          # Delay khi fetch mỗi magnitude range
-RETRY_DELAY_429 = 15       # Delay khi bị rate limit 429 (fetch list)
-RETRY_EVENT_429 = 10       # Delay khi bị rate limit 429 (crawl event)
+CRAWL_RATE = 5             # Số request tối đa mỗi giây tới USGS (chung cho mọi thread)
+RETRY_DELAY_MAX = 30       # Delay tối đa giữa 2 lần retry (backoff)
+CRAWL_WORKERS = 4          # Số request (events / magnitude ranges) chạy đồng thời
+YEAR_WORKERS = 2           # Số năm xử lý đồng thời (tổng request vẫn bị CRAWL_RATE giới hạn)
+PROGRESS_INTERVAL = 10     # Chế độ --quiet: in 1 dòng tiến độ mỗi bấy nhiêu giây
+BULK_MIN_SHARE = 0.1       # --bulk: chỉ tải cả range khi event thiếu chiếm ít nhất tỉ lệ này của range
+
+# Endpoint FDSN event của USGS
+USGS_QUERY_URL = "https://earthquake.usgs.gov/fdsnws/event/1/query"
+USGS_COUNT_URL = "https://earthquake.usgs.gov/fdsnws/event/1/count"
+
+# Cache danh sách event IDs theo (năm, magnitude range) trên disk
+# Xóa thư mục này để buộc tải lại toàn bộ
+LISTING_CACHE_DIR = ".usgs_cache"
+# Index tên file event của từng thư mục năm, dùng lại khi thư mục không đổi (mtime)
+LOCAL_INDEX_DIR = os.path.join(LISTING_CACHE_DIR, "local")
+LISTING_TTL_RECENT = 3600  # TTL (giây) cho năm hiện tại và năm trước, catalog còn được cập nhật
+LISTING_CHUNK_SIZE = 1 << 16  # Số bytes đọc mỗi lần khi stream danh sách (mặc định requests chỉ 512)
+
+
+class SharedRetry(Retry):
+    """
+    Retry của urllib3, khi server trả header Retry-After thì dừng luôn RATE_LIMITER
+
+    Retry-After là giới hạn cho cả client chứ không riêng 1 request: nếu chỉ thread nhận 429 chờ,
+    các thread khác vẫn gửi tiếp và nhận thêm 429
+
+    Backoff dùng full jitter (ngẫu nhiên trong [0, backoff]) để các thread cùng bị lỗi
+    không retry đồng loạt
+    """
+
+    def get_backoff_time(self):
+        return random.uniform(0, super().get_backoff_time())
+
+    def sleep_for_retry(self, response):
+        retry_after = self.get_retry_after(response)
+        if retry_after:
+            RATE_LIMITER.pause(retry_after)
+        return super().sleep_for_retry(response)
 
 
-def get_api_events(year, min_magnitude=None, max_magnitude=None):
+# Session dùng chung: giữ kết nối keep-alive tới USGS, không bắt tay TCP/TLS lại mỗi request
+SESSION = requests.Session()
+# Retry tập trung cho lỗi mạng và 429/5xx (exponential backoff full jitter, tôn trọng header Retry-After)
+# Mọi request đi qua SESSION nên không cần vòng retry thủ công ở từng hàm
+RETRY_POLICY = SharedRetry(
+    total=5,
+    backoff_factor=1.0,
+    backoff_max=RETRY_DELAY_MAX,
+    status_forcelist=[429, 500, 502, 503, 504],
+    allowed_methods=["GET"],
+    respect_retry_after_header=True,
+    raise_on_status=False,
+)
+SESSION.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=CRAWL_WORKERS * YEAR_WORKERS, max_retries=RETRY_POLICY))
+SESSION.headers["User-Agent"] = "earthquake-sequence-mining/auto_crawl"
+
+# Danh sách events lấy ở format=text (ít cột hơn CSV, phân cách '|'), EventID là cột đầu
+ID_COLUMN = '#EventID'
+
+# Tên file JSON: event_<mag>_<id>.json
+EVENT_FILE_RE = re.compile(r'^event_([^_]+)_(.+)\.json$')
+
+
+class RateLimiter:
+    """
+    Giới hạn tốc độ request phía client, dùng chung giữa các thread
+
+    Mỗi request được cấp 1 mốc thời gian cách mốc trước 1/rate giây; chỉ sleep khi tới sớm,
+    nên response nhanh không bị chờ thêm như delay cố định sau mỗi request
+    """
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate
+        self.next_allowed = 0.0
+        self.lock = threading.Lock()
+
+    def wait(self):
+        """Chờ tới lượt gửi request tiếp theo"""
+        with self.lock:
+            now = time.monotonic()
+            delay = self.next_allowed - now
+            self.next_allowed = max(self.next_allowed, now) + self.interval
+        if delay > 0:
+            time.sleep(delay)
+
+    def pause(self, seconds):
+        """Không cấp lượt mới trong `seconds` giây tới (vd. server yêu cầu qua Retry-After)"""
+        with self.lock:
+            self.next_allowed = max(self.next_allowed, time.monotonic() + seconds)
+
+
+RATE_LIMITER = RateLimiter(CRAWL_RATE)
+
+
+def get_api_events(year, min_magnitude=None, max_magnitude=None, log=print):
     """
     Lấy danh sách event IDs từ USGS API
     LUÔN LUÔN split theo magnitude ranges để đảm bảo không bị bỏ sót events
@@ -36,21 +131,162 @@ def get_api_events(year, min_magnitude=None, max_magnitude=None):
         year: Năm cần kiểm tra
         min_magnitude: Độ lớn tối thiểu
         max_magnitude: Độ lớn tối đa
+        log: Hàm in từng dòng tiến độ (mặc định print)
 
     Returns:
         set: Set của event IDs từ API
     """
     # LUÔN LUÔN split theo magnitude ranges
-    return get_api_events_by_mag_ranges(year, min_magnitude, max_magnitude)
+    return get_api_events_by_mag_ranges(year, min_magnitude, max_magnitude, log=log)
+
 
+def year_params(year, range_min, range_max, **extra):
+    """Tham số query events của 1 năm trong khoảng magnitude [range_min, range_max] (kèm tham số thêm)"""
+    return {
+        "starttime": f"{year}-01-01",
+        "endtime": f"{year}-12-31",
+        "minmagnitude": range_min,
+        "maxmagnitude": range_max,
+        **extra
+    }
 
-def get_api_events_by_mag_ranges(year, min_magnitude=None, max_magnitude=None):
+
+def count_window(min_magnitude=None, max_magnitude=None):
+    """Khoảng magnitude của query count: filter của user cắt trong [0, 11] mà get_api_events_by_mag_ranges quét"""
+    return (
+        max(0, min_magnitude) if min_magnitude is not None else 0,
+        min(11, max_magnitude) if max_magnitude is not None else 11
+    )
+
+
+def get_api_count(year, min_magnitude=None, max_magnitude=None):
     """
-    Lấy event IDs bằng cách split theo magnitude ranges [0,0.5), [0.5,1), [1,1.5), ...
-    Chia nhỏ hơn để tránh vượt quá limit 20000 events/request của USGS API
+    Đếm số events trên USGS API bằng endpoint count (response chỉ là 1 con số)
+
+    Args:
+        year: Năm cần kiểm tra
+        min_magnitude: Độ lớn tối thiểu
+        max_magnitude: Độ lớn tối đa
+
+    Returns:
+        int: Số events, hoặc None nếu request lỗi
     """
-    all_event_ids = set()
+    params = year_params(year, *count_window(min_magnitude, max_magnitude))
+
+    try:
+        RATE_LIMITER.wait()
+        r = SESSION.get(USGS_COUNT_URL, params=params, timeout=30)
+
+        if r.status_code != 200:
+            return None
+
+        return int(r.content.strip())
+
+    except Exception:
+        return None
+
+
+def listing_cache_path(year, range_min, range_max):
+    """Đường dẫn file cache danh sách event IDs của 1 magnitude range"""
+    return os.path.join(LISTING_CACHE_DIR, f"{year}_M{range_min}-M{range_max}.txt")
+
+
+def read_listing_meta(cache_path):
+    """Đọc ETag / Last-Modified / max-age đã lưu cạnh file cache (dict rỗng nếu chưa có)"""
+    try:
+        with open(f"{cache_path}.meta", 'rb') as f:
+            return orjson.loads(f.read())
+    except (OSError, orjson.JSONDecodeError):
+        return {}
+
+
+def listing_meta(response):
+    """Lấy validators (ETag, Last-Modified) và max-age (hoặc Expires - Date) từ header response"""
+    meta = {}
+    if response.headers.get("ETag"):
+        meta["etag"] = response.headers["ETag"]
+    if response.headers.get("Last-Modified"):
+        meta["last_modified"] = response.headers["Last-Modified"]
+    match = re.search(r'max-age=(\d+)', response.headers.get("Cache-Control", ""))
+    if match:
+        meta["max_age"] = int(match.group(1))
+    elif response.headers.get("Expires") and response.headers.get("Date"):
+        # Không có max-age: thời gian còn hiệu lực = Expires - Date (cùng đồng hồ server)
+        try:
+            expires = parsedate_to_datetime(response.headers["Expires"])
+            date = parsedate_to_datetime(response.headers["Date"])
+            meta["max_age"] = max(0, int((expires - date).total_seconds()))
+        except (TypeError, ValueError):
+            pass
+    return meta
+
+
+def conditional_headers(cache_path):
+    """Header If-None-Match / If-Modified-Since cho cache đã hết hạn, để server trả 304 nếu không đổi"""
+    if not os.path.exists(cache_path):
+        return {}
+    meta = read_listing_meta(cache_path)
+    headers = {}
+    if "etag" in meta:
+        headers["If-None-Match"] = meta["etag"]
+    if "last_modified" in meta:
+        headers["If-Modified-Since"] = meta["last_modified"]
+    return headers
+
+
+def read_listing_cache(cache_path, year, check_ttl=True):
+    """
+    Đọc danh sách event IDs đã cache
+
+    Năm cũ (trước năm trước) coi như không đổi nên cache không hết hạn,
+    năm hiện tại và năm trước hết hạn theo Cache-Control max-age của server
+    (mặc định LISTING_TTL_RECENT)
+
+    Args:
+        cache_path: File cache
+        year: Năm của danh sách
+        check_ttl: False để đọc cả cache đã hết hạn (sau khi server trả 304)
+
+    Returns:
+        set: Set event IDs, hoặc None nếu chưa có cache / cache hết hạn
+    """
+    try:
+        mtime = os.stat(cache_path).st_mtime
+    except OSError:
+        return None
+
+    if check_ttl and int(year) >= time.localtime().tm_year - 1:
+        ttl = read_listing_meta(cache_path).get("max_age", LISTING_TTL_RECENT)
+        if time.time() - mtime > ttl:
+            return None
+
+    with open(cache_path, encoding='utf-8') as f:
+        return set(f.read().split())
+
+
+def write_listing_cache(cache_path, event_ids, meta=None):
+    """Ghi danh sách event IDs (và meta) vào cache (ghi file tạm rồi rename, không để lại file dở)"""
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        tmp_path = f"{cache_path}.meta.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(orjson.dumps(meta or {}))
+        os.replace(tmp_path, f"{cache_path}.meta")
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(sorted(event_ids)))
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        pass
+
+
+def iter_mag_ranges(min_magnitude=None, max_magnitude=None):
+    """
+    Các magnitude range [0,0.5), [0.5,1), ..., [10,11) đã cắt theo filter của user
 
+    Returns:
+        generator: (range_min, range_max), bỏ qua các range rỗng
+    """
     # Xác định các range cần crawl - chia nhỏ thành 0.5
     mag_ranges = []
     for i in range(20):  # 0.0, 0.5, 1.0, 1.5, ... 9.5, 10.0
@@ -69,51 +305,172 @@ def get_api_events_by_mag_ranges(year, min_magnitude=None, max_magnitude=None):
         if range_min >= range_max:
             continue
 
-        range_str = f"M{range_min}-M{range_max}" if range_max < 10 else f"M{range_min}-M10"
-        print(f"  Fetching {range_str}...", end=" ")
-
-        url = "https://earthquake.usgs.gov/fdsnws/event/1/query"
-        params = {
-            "format": "csv",
-            "starttime": f"{year}-01-01",
-            "endtime": f"{year}-12-31",
-            "orderby": "time-asc",
-            "minmagnitude": range_min,
-            "maxmagnitude": range_max
-        }
+        yield range_min, range_max
 
-        try:
-            r = requests.get(url, params=params, timeout=30)
 
-            if r.status_code == 429:
-                time.sleep(RETRY_DELAY_429)
-                r = requests.get(url, params=params, timeout=30)
+def is_listing_cached(year, min_magnitude=None, max_magnitude=None):
+    """Mọi magnitude range của năm đều có cache còn hạn (không cần gọi API)"""
+    return all(
+        read_listing_cache(listing_cache_path(year, range_min, range_max), year) is not None
+        for range_min, range_max in iter_mag_ranges(min_magnitude, max_magnitude)
+    )
+
+
+def fetch_range_ids(year, range_min, range_max):
+    """
+    Lấy event IDs của 1 magnitude range (ưu tiên cache, hết hạn thì hỏi lại có điều kiện)
+
+    Args:
+        year: Năm cần lấy
+        range_min: Độ lớn tối thiểu của range
+        range_max: Độ lớn tối đa của range
+
+    Returns:
+        tuple: (set event IDs hoặc None nếu lỗi, thông báo kết quả)
+    """
+    cache_path = listing_cache_path(year, range_min, range_max)
+    cached_ids = read_listing_cache(cache_path, year)
+    if cached_ids is not None:
+        return cached_ids, f"✓ {len(cached_ids)} events (cache)"
+
+    params = year_params(year, range_min, range_max, format="text", orderby="time-asc")
+
+    # Cache hết hạn nhưng còn file: hỏi có điều kiện, 304 thì dùng lại cache
+    headers = conditional_headers(cache_path)
+
+    try:
+        RATE_LIMITER.wait()
+        with SESSION.get(USGS_QUERY_URL, params=params, headers=headers, timeout=30, stream=True) as r:
+            if r.status_code == 304:
+                cached_ids = read_listing_cache(cache_path, year, check_ttl=False)
+                if cached_ids is not None:
+                    # Gia hạn cache (mtime) và cập nhật max-age mới nếu có
+                    write_listing_cache(cache_path, cached_ids, {**read_listing_meta(cache_path), **listing_meta(r)})
+                    return cached_ids, f"✓ {len(cached_ids)} events (not modified)"
+
+            # 204: range không có event nào (mặc định của FDSN khi không có dữ liệu), cache như danh sách rỗng
+            if r.status_code == 204:
+                write_listing_cache(cache_path, set(), listing_meta(r))
+                return set(), "✓ 0 events"
 
             if r.status_code != 200:
-                print(f"✗ Error {r.status_code}")
-                time.sleep(FETCH_DELAY)
-                continue
-
-            # Parse CSV đúng cách với csv.DictReader
-            reader = csv.DictReader(StringIO(r.text))
-            range_count = 0
-            for row in reader:
-                if 'id' in row and row['id']:
-                    event_id = row['id'].strip()
-                    if event_id:
-                        all_event_ids.add(event_id)
-                        range_count += 1
-
-            print(f"✓ {range_count} events")
-            time.sleep(FETCH_DELAY)
-
-        except Exception as e:
-            print(f"✗ Error: {e}")
-            time.sleep(FETCH_DELAY)
+                return None, f"✗ Error {r.status_code}"
+
+            # Đọc từng dòng khi response còn đang tải, chỉ lấy cột đầu (EventID), không giữ cả body
+            lines = r.iter_lines(chunk_size=LISTING_CHUNK_SIZE)
+            header = next(lines, b'').decode('utf-8', 'replace').strip().split('|')
+            # Body không phải danh sách events (trang bảo trì, body rỗng, đổi format): báo lỗi,
+            # KHÔNG ghi cache (cache năm cũ không hết hạn, range sẽ bị coi là rỗng mãi)
+            if header[0] != ID_COLUMN:
+                return None, "✗ Error: unexpected response (no EventID header)"
+            range_ids = {line.split(b'|', 1)[0].strip().decode('utf-8') for line in lines}
+            range_ids.discard('')
+            write_listing_cache(cache_path, range_ids, listing_meta(r))
+
+        return range_ids, f"✓ {len(range_ids)} events"
+
+    except Exception as e:
+        return None, f"✗ Error: {e}"
+
+
+def get_api_events_by_mag_ranges(year, min_magnitude=None, max_magnitude=None, log=print):
+    """
+    Lấy event IDs bằng cách split theo magnitude ranges [0,0.5), [0.5,1), [1,1.5), ...
+    Chia nhỏ hơn để tránh vượt quá limit 20000 events/request của USGS API
+    """
+    all_event_ids = set()
+    mag_ranges = list(iter_mag_ranges(min_magnitude, max_magnitude))
+
+    # Các range tải đồng thời (nhịp request do RATE_LIMITER điều phối), in kết quả theo thứ tự range
+    with ThreadPoolExecutor(max_workers=CRAWL_WORKERS) as executor:
+        results = executor.map(lambda r: fetch_range_ids(year, *r), mag_ranges)
+        for (range_min, range_max), (range_ids, message) in zip(mag_ranges, results):
+            range_str = f"M{range_min}-M{range_max}" if range_max < 10 else f"M{range_min}-M10"
+            log(f"  Fetching {range_str}... {message}")
+            if range_ids:
+                all_event_ids |= range_ids
 
     return all_event_ids
 
 
+def iter_event_names(year_dir):
+    """
+    Duyệt tên các file event_*.json trong thư mục năm (1 lần os.scandir, không stat từng file)
+
+    Args:
+        year_dir: Đường dẫn thư mục năm
+
+    Returns:
+        generator: Tên file (không kèm đường dẫn)
+    """
+    if not os.path.isdir(year_dir):
+        return
+    with os.scandir(year_dir) as it:
+        for entry in it:
+            name = entry.name
+            if name.startswith("event_") and name.endswith(".json"):
+                yield name
+
+
+def local_index_path(year_dir):
+    """Đường dẫn file index tên file event của 1 thư mục năm"""
+    return os.path.join(LOCAL_INDEX_DIR, re.sub(r'[^\w.-]', '_', os.path.abspath(year_dir)) + ".names")
+
+
+def list_event_names(year_dir):
+    """
+    Danh sách tên file event_*.json trong thư mục năm, dùng index trên disk nếu còn đúng
+
+    Index lưu kèm mtime của thư mục (đổi mỗi khi thêm / xóa / đổi tên file),
+    khớp thì đọc index thay vì quét lại cả thư mục
+
+    Args:
+        year_dir: Đường dẫn thư mục năm
+
+    Returns:
+        list: Tên file (không kèm đường dẫn)
+    """
+    try:
+        # Lấy mtime TRƯỚC khi quét: file thêm vào trong lúc quét làm index lệch mtime, lần sau quét lại
+        mtime = str(os.stat(year_dir).st_mtime_ns)
+    except OSError:
+        return []
+
+    index_path = local_index_path(year_dir)
+    try:
+        with open(index_path, encoding='utf-8') as f:
+            index_mtime, _, body = f.read().partition('\n')
+        if index_mtime == mtime:
+            return body.split('\n') if body else []
+    except OSError:
+        pass
+
+    names = list(iter_event_names(year_dir))
+    try:
+        os.makedirs(LOCAL_INDEX_DIR, exist_ok=True)
+        tmp_path = f"{index_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(mtime + '\n' + '\n'.join(names))
+        os.replace(tmp_path, index_path)
+    except OSError:
+        pass
+    return names
+
+
+def parse_event_filename(name):
+    """
+    Tách magnitude và event ID từ tên file event_<mag>_<id>.json
+
+    Args:
+        name: Tên file (không kèm đường dẫn)
+
+    Returns:
+        tuple: (mag_str, event_id), hoặc None nếu tên không đúng định dạng
+    """
+    match = EVENT_FILE_RE.match(name)
+    return match.groups() if match else None
+
+
 def get_json_event_ids(year_dir, min_mag=None, max_mag=None, exclude_unknown=True):
     """
     Lấy event IDs từ JSON files trong thư mục
@@ -129,18 +486,15 @@ def get_json_event_ids(year_dir, min_mag=None, max_mag=None, exclude_unknown=Tru
     Returns:
         set: Set của event IDs
     """
-    json_files = glob.glob(os.path.join(year_dir, "event_*.json"))
     event_ids = set()
 
-    for json_file in json_files:
-        basename = os.path.basename(json_file)
-        # Format: event_<mag>_<id>.json
-        name = basename.replace('event_', '').replace('.json', '')
-        parts = name.split('_')
-        if len(parts) >= 2:
+    for name in list_event_names(year_dir):
+        parsed = parse_event_filename(name)
+        if parsed:
+            mag_str, event_id = parsed
             # Extract magnitude từ filename
             try:
-                mag = float(parts[0])
+                mag = float(mag_str)
                 # Filter theo magnitude
                 if min_mag is not None and mag < min_mag:
                     continue
@@ -157,144 +511,294 @@ def get_json_event_ids(year_dir, min_mag=None, max_mag=None, exclude_unknown=Tru
                 if max_mag is not None:
                     continue
 
-            event_id = '_'.join(parts[1:])  # Bỏ magnitude, giữ lại ID
             event_ids.add(event_id)
 
     return event_ids
 
 
-def crawl_missing_events(year, missing_events, min_mag=None, max_mag=None):
+def save_event_file(year_dir, event_id, mag_str, raw):
     """
-    Crawl các events bị thiếu
+    Lưu JSON của 1 event thành event_<mag>_<id>.json
+
+    Ghi file tạm rồi rename để crawl bị ngắt không để lại file dở
+    (file dở sẽ bị coi là đã crawl ở lần chạy sau)
+    """
+    json_filename = f"event_{mag_str}_{event_id}.json"
+    tmp_path = os.path.join(year_dir, f".{json_filename}.tmp")
+    with open(tmp_path, 'wb') as f:
+        f.write(raw)
+    os.replace(tmp_path, os.path.join(year_dir, json_filename))
+
+
+def fetch_range_features(year, range_min, range_max):
+    """
+    Tải GeoJSON (dạng summary) của mọi events trong 1 magnitude range của năm
+
+    Returns:
+        list: Danh sách features, hoặc None nếu request lỗi
+    """
+    params = year_params(year, range_min, range_max, format="geojson", orderby="time-asc")
+
+    try:
+        RATE_LIMITER.wait()
+        r = SESSION.get(USGS_QUERY_URL, params=params, timeout=60)
+        if r.status_code == 204:
+            return []
+        if r.status_code != 200:
+            return None
+        return orjson.loads(r.content).get("features") or []
+    except Exception:
+        return None
+
+
+def crawl_missing_events_bulk(year, year_dir, missing_events, min_mag=None, max_mag=None):
+    """
+    Lấy events thiếu theo lô: mỗi magnitude range 1 request GeoJSON, tách ra từng file event
+
+    Chỉ tải range mà danh sách đã cache (listing_cache_path) có hơn 1 event thiếu và số event thiếu
+    chiếm ít nhất BULK_MIN_SHARE của range; event ở các range còn lại crawl từng cái như thường
+
+    File lưu là feature dạng summary (không có phần products như khi query theo eventid)
 
     Args:
         year: Năm cần crawl
-        missing_events: List event IDs bị thiếu
+        year_dir: Thư mục năm để lưu file JSON
+        missing_events: Event IDs cần lấy
         min_mag: Minimum magnitude filter
         max_mag: Maximum magnitude filter
 
     Returns:
-        int: Số events crawl thành công
+        set: Event IDs đã lưu
     """
-    if not missing_events:
-        return 0
+    wanted = set(missing_events)
+    saved = set()
 
-    print(f"\n  🔄 Auto-crawling {len(missing_events)} missing events...")
+    mag_ranges = []
+    for range_min, range_max in iter_mag_ranges(min_mag, max_mag):
+        range_ids = read_listing_cache(listing_cache_path(year, range_min, range_max), year, check_ttl=False)
+        if not range_ids:
+            continue
+        range_missing = len(range_ids & wanted)
+        if range_missing > 1 and range_missing >= BULK_MIN_SHARE * len(range_ids):
+            mag_ranges.append((range_min, range_max))
+
+    with ThreadPoolExecutor(max_workers=CRAWL_WORKERS) as executor:
+        for features in executor.map(lambda r: fetch_range_features(year, *r), mag_ranges):
+            for feature in features or []:
+                event_id = feature.get("id")
+                mag = (feature.get("properties") or {}).get("mag")
+                # BỎ QUA event không cần / đã lưu / magnitude unknown
+                if event_id not in wanted or event_id in saved or mag is None:
+                    continue
+                save_event_file(year_dir, event_id, str(mag), orjson.dumps(feature))
+                saved.add(event_id)
 
-    success_count = 0
-    index = 1
+    return saved
 
-    for event_id in missing_events:
-        year_dir = os.path.join("data", str(year))
-        os.makedirs(year_dir, exist_ok=True)
 
-        # Check if JSON file already exists (by event ID only, ignore magnitude)
-        existing_files = glob.glob(os.path.join(year_dir, f"event_*_{event_id}.json"))
+def fetch_event(event_id, year_dir, existing_ids=None):
+    """
+    Crawl 1 event và lưu JSON vào year_dir (dùng được trực tiếp, không cần subprocess)
 
-        # Skip nếu file đã tồn tại
-        if existing_files:
-            print(f"    [{index}] ⊗ {event_id} - skipped (already exists)")
-            index += 1
-            continue
+    Args:
+        event_id: ID của event
+        year_dir: Thư mục năm để lưu file JSON
+        existing_ids: Set event IDs đã có file (quét sẵn), None thì tự glob thư mục
 
-        try:
-            url = "https://earthquake.usgs.gov/fdsnws/event/1/query"
-            params = {"eventid": event_id, "format": "geojson"}
-            r = requests.get(url, params=params, timeout=30)
-
-            if r.status_code == 429:
-                print(f"    Rate limited on {event_id}, waiting {RETRY_EVENT_429}s...")
-                time.sleep(RETRY_EVENT_429)
-                r = requests.get(url, params=params, timeout=30)
-
-            if r.status_code == 200:
-                data = r.json()
-
-                # Get feature from response
-                if "features" in data and data["features"]:
-                    feature = data["features"][0]
-                elif data.get("type") == "Feature":
-                    feature = data
-                else:
-                    continue
+    Returns:
+        tuple: (status, detail)
+            - ('ok', (mag_str, place)): crawl thành công
+            - ('skipped', None): file đã tồn tại
+            - ('failed', None): HTTP lỗi / không có feature / mag unknown
+            - ('failed', message): hết lượt retry khi bị rate limit (429)
+            - ('error', exception): lỗi khi crawl
+    """
+    # Check if JSON file already exists (by event ID only, ignore magnitude)
+    if existing_ids is not None:
+        exists = event_id in existing_ids
+    else:
+        exists = bool(glob.glob(os.path.join(year_dir, f"event_*_{event_id}.json")))
 
-                props = feature["properties"]
-                mag = props.get("mag", 0)
+    # Skip nếu file đã tồn tại
+    if exists:
+        return 'skipped', None
 
-                # BỎ QUA nếu magnitude là None/unknown
-                if mag is None:
-                    continue
+    try:
+        params = {"eventid": event_id, "format": "geojson"}
+        RATE_LIMITER.wait()
+        r = SESSION.get(USGS_QUERY_URL, params=params, timeout=30)
 
-                mag_str = str(mag)
+        if r.status_code == 429:
+            return 'failed', "rate limited, retries exhausted"
 
-                # Save JSON
-                json_filename = f"event_{mag_str}_{event_id}.json"
-                json_path = os.path.join(year_dir, json_filename)
+        if r.status_code != 200:
+            return 'failed', None
 
-                with open(json_path, 'w', encoding='utf-8') as f:
-                    json.dump(data, f, indent=2, ensure_ascii=False)
+        # Parse 1 lần chỉ để lấy các field cần (mag, place); file lưu nguyên body server trả về
+        raw = r.content
+        data = orjson.loads(raw)
 
-                place = props.get('place', 'Unknown')
-                print(f"    [{index}] ✓ {event_id} (M{mag_str}): {place}")
+        # Get feature from response
+        if "features" in data and data["features"]:
+            feature = data["features"][0]
+        elif data.get("type") == "Feature":
+            feature = data
+        else:
+            return 'failed', None
 
-                success_count += 1
-                index += 1
+        props = feature["properties"]
+        mag = props.get("mag", 0)
+
+        # BỎ QUA nếu magnitude là None/unknown
+        if mag is None:
+            return 'failed', None
+
+        mag_str = str(mag)
 
-                # Delay to avoid rate limit
-                time.sleep(CRAWL_DELAY)
+        # Ghi thẳng body gốc (không serialize lại)
+        save_event_file(year_dir, event_id, mag_str, raw)
+
+        return 'ok', (mag_str, props.get('place', 'Unknown'))
+
+    except Exception as e:
+        return 'error', e
+
+
+def crawl_missing_events(year, missing_events, min_mag=None, max_mag=None, bulk=False, quiet=False, log=print,
+                         year_dir=None):
+    """
+    Crawl các events bị thiếu
 
-        except Exception as e:
-            print(f"    [{index}] ✗ {event_id}: {e}")
-            index += 1
+    Args:
+        year: Năm cần crawl
+        missing_events: List event IDs bị thiếu
+        min_mag: Minimum magnitude filter
+        max_mag: Maximum magnitude filter
+        bulk: Lấy theo lô qua query magnitude range (ít request hơn), event còn thiếu mới crawl từng cái
+        quiet: Không in dòng cho từng event thành công / bỏ qua, chỉ in tiến độ mỗi PROGRESS_INTERVAL giây
+            (lỗi và tổng kết vẫn in)
+        log: Hàm in từng dòng tiến độ (mặc định print)
+        year_dir: Thư mục năm để lưu file JSON (mặc định data/<year>)
+
+    Returns:
+        int: Số events crawl thành công
+    """
+    if not missing_events:
+        return 0
 
-    print(f"  ✓ Crawled {success_count} events")
+    log(f"\n  🔄 Auto-crawling {len(missing_events)} missing events...")
+
+    if year_dir is None:
+        year_dir = os.path.join("data", str(year))
+    os.makedirs(year_dir, exist_ok=True)
+
+    # Quét thư mục 1 lần, mỗi event chỉ cần tra set thay vì glob lại cả thư mục
+    existing_ids = {parsed[1] for parsed in map(parse_event_filename, list_event_names(year_dir)) if parsed}
+
+    success_count = 0
+
+    if bulk:
+        pending = [event_id for event_id in missing_events if event_id not in existing_ids]
+        saved = crawl_missing_events_bulk(year, year_dir, pending, min_mag, max_mag)
+        log(f"    ✓ Bulk: {len(saved)} events from magnitude range queries")
+        success_count += len(saved)
+        missing_events = [event_id for event_id in pending if event_id not in saved]
+
+    # Crawl đồng thời tối đa CRAWL_WORKERS events (I/O-bound, chờ network là chính)
+    with ThreadPoolExecutor(max_workers=CRAWL_WORKERS) as executor:
+        future_to_id = {
+            executor.submit(fetch_event, event_id, year_dir, existing_ids): event_id
+            for event_id in missing_events
+        }
+        total = len(future_to_id)
+        next_progress = time.monotonic() + PROGRESS_INTERVAL
+        # In theo thứ tự hoàn thành, event chậm không chặn tiến độ của các event sau
+        for index, future in enumerate(as_completed(future_to_id), 1):
+            event_id = future_to_id[future]
+            status, detail = future.result()
+            if status == 'ok':
+                success_count += 1
+            if status == 'skipped' and not quiet:
+                log(f"    [{index}/{total}] ⊗ {event_id} - skipped (already exists)")
+            elif status == 'ok' and not quiet:
+                mag_str, place = detail
+                log(f"    [{index}/{total}] ✓ {event_id} (M{mag_str}): {place}")
+            elif status == 'error' or (status == 'failed' and detail):
+                log(f"    [{index}/{total}] ✗ {event_id}: {detail}")
+
+            if quiet and time.monotonic() >= next_progress:
+                log(f"    [{index}/{total}] {success_count} crawled")
+                next_progress = time.monotonic() + PROGRESS_INTERVAL
+
+    log(f"  ✓ Crawled {success_count} events")
     return success_count
 
 
-def check_year(year_dir, min_mag=None, max_mag=None, autofill=False):
-    """Kiểm tra event thiếu cho 1 năm"""
+def check_year(year_dir, min_mag=None, max_mag=None, autofill=False, json_event_ids=None, bulk=False,
+               quiet=False, log=print):
+    """Kiểm tra event thiếu cho 1 năm (json_event_ids: IDs local đã quét sẵn, nếu có; log: hàm in từng dòng)"""
     year = os.path.basename(year_dir)
 
     # Lấy event IDs từ JSON files (chỉ lấy các file có mag hợp lệ)
-    json_event_ids = get_json_event_ids(year_dir, min_mag, max_mag, exclude_unknown=True)
+    if json_event_ids is None:
+        json_event_ids = get_json_event_ids(year_dir, min_mag, max_mag, exclude_unknown=True)
+
+    json_count = len(json_event_ids)
+
+    # Danh sách đã cache đủ thì so sánh thẳng với cache, không request nào
+    # Chưa có cache: hỏi count trước, nếu khớp số JSON local thì bỏ qua tải danh sách events
+    # (chỉ đếm file local nằm trong cùng khoảng magnitude với query count, vd. bỏ mag âm)
+    if not is_listing_cached(year, min_mag, max_mag):
+        api_count = get_api_count(year, min_mag, max_mag)
+        window_count = len(get_json_event_ids(year_dir, *count_window(min_mag, max_mag), exclude_unknown=True))
+        if api_count is not None and api_count == json_count == window_count:
+            log(f"{year}: api={api_count}, json={json_count}, missing=0")
+            return year, 0
 
     # Lấy event IDs từ USGS API (với filter min/max mag)
-    api_event_ids = get_api_events(year, min_mag, max_mag)
+    api_event_ids = get_api_events(year, min_mag, max_mag, log=log)
 
-    json_count = len(json_event_ids)
     api_count = len(api_event_ids)
     missing_count = api_count - json_count
 
     # Hiển thị kết quả
-    print(f"{year}: api={api_count}, json={json_count}, missing={missing_count}")
+    log(f"{year}: api={api_count}, json={json_count}, missing={missing_count}")
 
-    # Events có trong API nhưng KHÔNG có JSON
-    missing = sorted(api_event_ids - json_event_ids)
+    # Events có trong API nhưng KHÔNG có JSON (chỉ cần set, sort khi thật sự crawl)
+    missing = api_event_ids - json_event_ids
 
     # Auto-fill nếu được yêu cầu
     if autofill and missing:
-        crawl_missing_events(year, missing, min_mag, max_mag)
+        crawl_missing_events(year, sorted(missing), min_mag, max_mag, bulk=bulk, quiet=quiet, log=log,
+                             year_dir=year_dir)
 
     return year, len(missing)
 
 
 def count_unknown_mag(year_dir):
     """Đếm số files có magnitude unknown"""
-    json_files = glob.glob(os.path.join(year_dir, "event_*.json"))
     count = 0
-    for json_file in json_files:
-        basename = os.path.basename(json_file)
-        name = basename.replace('event_', '').replace('.json', '')
-        parts = name.split('_')
-        if len(parts) >= 1:
-            try:
-                float(parts[0])
-            except ValueError:
-                count += 1
+    for name in list_event_names(year_dir):
+        parsed = parse_event_filename(name)
+        # Tên không khớp regex (vd. event_.json): lấy phần trước dấu _ đầu tiên
+        mag_str = parsed[0] if parsed else name[len('event_'):-len('.json')].split('_', 1)[0]
+        try:
+            float(mag_str)
+        except ValueError:
+            count += 1
     return count
 
 
-def main():
+def main(argv=None):
+    """
+    Entry point CLI, gọi được trực tiếp từ script khác (không cần subprocess)
+
+    Args:
+        argv: Danh sách tham số dòng lệnh (None thì lấy sys.argv[1:])
+
+    Returns:
+        int: Exit code
+    """
     parser = argparse.ArgumentParser(
         description="Auto crawl earthquake data từ USGS API",
         epilog="""
@@ -320,9 +824,15 @@ Examples:
     parser.add_argument("--min-mag", type=float, default=None, help="Lọc theo độ lớn tối thiểu")
     parser.add_argument("--max-mag", type=float, default=None, help="Lọc theo độ lớn tối đa")
     parser.add_argument("--no-autofill", action="store_true", help="Chỉ kiểm tra, không tự động crawl")
+    parser.add_argument("--bulk", action="store_true",
+                        help="Crawl events thiếu theo lô (GeoJSON summary theo magnitude range) thay vì từng event")
+    parser.add_argument("--quiet", action="store_true",
+                        help="Không in từng event đã crawl, chỉ in lỗi và tổng kết")
+    parser.add_argument("--year-workers", type=int, default=YEAR_WORKERS,
+                        help="Số năm kiểm tra/crawl đồng thời (>1: mỗi dòng output có tiền tố [năm])")
     parser.add_argument("--output-dir", type=str, default="data")
 
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
 
     # Validate: cần ít nhất một năm hoặc --all
     if not args.year and not args.all:
@@ -334,10 +844,9 @@ Examples:
         data_dir = args.output_dir
         years_to_check = []
         if os.path.exists(data_dir):
-            for item in os.listdir(data_dir):
-                item_path = os.path.join(data_dir, item)
-                if os.path.isdir(item_path) and item.isdigit():
-                    years_to_check.append(item)
+            # scandir: loại thư mục lấy từ dirent, không stat từng mục
+            with os.scandir(data_dir) as it:
+                years_to_check = [entry.name for entry in it if entry.is_dir() and entry.name.isdigit()]
         years_to_check.sort()
     else:
         years_to_check = args.year if args.year else []
@@ -355,16 +864,49 @@ Examples:
     print(f"Auto-crawl: {'ON' if autofill_enabled else 'OFF'}")
     print("=" * 60)
 
+    year_dirs = [os.path.join(args.output_dir, year) for year in years_to_check]
+    year_dirs = [year_dir for year_dir in year_dirs if os.path.isdir(year_dir)]
+
+    # Quét JSON local của các năm song song (mỗi năm độc lập, không chia sẻ state)
+    with ProcessPoolExecutor() as executor:
+        local_event_ids = list(executor.map(
+            get_json_event_ids,
+            year_dirs,
+            repeat(args.min_mag),
+            repeat(args.max_mag)
+        ))
+
+    # Các năm chạy chồng nhau để tận dụng thời gian chờ network;
+    # RATE_LIMITER dùng chung nên tổng số request/giây tới USGS không đổi
+    # Nhiều năm chạy cùng lúc: in từng dòng ngay khi có, thêm tiền tố [năm] và giữ lock để các dòng không xen nhau
+    year_workers = max(1, args.year_workers)
+    # Pool kết nối theo số năm thực tế (--year-workers), không theo YEAR_WORKERS lúc import
+    SESSION.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=CRAWL_WORKERS * year_workers,
+                                          max_retries=RETRY_POLICY))
+    print_lock = threading.Lock()
+
+    def year_log(year):
+        def log(text):
+            with print_lock:
+                for line in str(text).split("\n"):
+                    print(f"[{year}] {line}" if line else "", flush=True)
+        return log
+
+    def run_year(year_dir, json_event_ids):
+        return check_year(
+            year_dir,
+            args.min_mag,
+            args.max_mag,
+            autofill=autofill_enabled,
+            json_event_ids=json_event_ids,
+            bulk=args.bulk,
+            quiet=args.quiet,
+            log=year_log(os.path.basename(year_dir)) if year_workers > 1 and len(year_dirs) > 1 else print
+        )
+
     total_missing = 0
-    for year in years_to_check:
-        full_path = os.path.join(args.output_dir, year)
-        if os.path.isdir(full_path):
-            _, missing_count = check_year(
-                full_path,
-                args.min_mag,
-                args.max_mag,
-                autofill=autofill_enabled
-            )
+    with ThreadPoolExecutor(max_workers=year_workers) as executor:
+        for _, missing_count in executor.map(run_year, year_dirs, local_event_ids):
             total_missing += missing_count
 
     print("\n" + "=" * 60)
@@ -375,7 +917,8 @@ Examples:
     else:
         print(f"ALL EVENTS COMPLETE!")
     print("=" * 60)
+    return 0
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
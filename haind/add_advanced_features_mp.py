@@ -717,10 +717,9 @@ if 'step3_clustering' not in completed_steps:
     # Time since sequence start - OPTIMIZED
     mainshock_times = df_work[df_work['is_seq_mainshock'] == 1].set_index('sequence_id')['time'].to_dict()
 
-    def get_mainshock_time(seq_id):
-        return mainshock_times.get(seq_id, df_work['time'].iloc[0])
-
-    mainshock_time_series = df_work['sequence_id'].apply(get_mainshock_time)
+    # Vectorized lookup (no per-row Timestamp), sequences without a mainshock fall back to the first event time
+    has_mainshock = df_work['sequence_id'].isin(mainshock_times.keys())
+    mainshock_time_series = df_work['sequence_id'].map(mainshock_times).where(has_mainshock, df_work['time'].iloc[0])
     df_work['time_since_seq_start_sec'] = (df_work['time'] - mainshock_time_series).dt.total_seconds().fillna(0)
 
     # Print statistics
@@ -10,29 +10,21 @@ import seaborn as sns
 
 
 RELATION_COLS = ["mag", "depth", "gap", "nst", "rms"]
+REQUIRED_COLS = ["id", "time", "latitude", "longitude", "depth", "mag", "gap", "nst", "rms"]
 
 
 def load_dataset(input_csv: Path) -> pd.DataFrame:
     if not input_csv.exists():
         raise FileNotFoundError(f"Input CSV not found: {input_csv}")
 
-    df = pd.read_csv(input_csv)
-
-    required_cols = {
-        "id",
-        "time",
-        "latitude",
-        "longitude",
-        "depth",
-        "mag",
-        "gap",
-        "nst",
-        "rms",
-    }
-    missing = sorted(required_cols - set(df.columns))
+    header = pd.read_csv(input_csv, nrows=0).columns
+    missing = sorted(set(REQUIRED_COLS) - set(header))
     if missing:
         raise ValueError(f"Input CSV is missing required columns: {missing}")
 
+    # Only the columns the EDA uses are parsed (pyarrow reader, multi-threaded)
+    df = pd.read_csv(input_csv, engine="pyarrow", usecols=REQUIRED_COLS)
+
     df["time"] = pd.to_datetime(df["time"], errors="coerce", utc=True)
 
     num_cols = ["latitude", "longitude", "depth", "mag", "gap", "nst", "rms"]
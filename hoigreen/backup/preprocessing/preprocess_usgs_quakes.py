@@ -1,9 +1,11 @@
 import argparse
-import json
+import os
 import time
+from concurrent.futures import Executor, ProcessPoolExecutor
 from pathlib import Path
-from typing import Any, Dict, List, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 
+import orjson
 import pandas as pd
 from tqdm import tqdm
 
@@ -24,6 +26,15 @@ COLUMNS = [
     "type",
 ]
 
+# Rows per to_csv write batch, keeps memory flat on full-dataset exports
+CSV_CHUNKSIZE = 50000
+
+# Files per task sent to a parser process
+PARSE_CHUNKSIZE = 64
+
+# Codec for .parquet outputs (columnar, dictionary-encoded strings)
+PARQUET_COMPRESSION = "zstd"
+
 
 MAG_TYPE_ALIASES = {
     "mb_lg": "mblg",
@@ -33,13 +44,13 @@ MAG_TYPE_ALIASES = {
 }
 
 
-def parse_usgs_json(obj: Any) -> List[Dict[str, Any]]:
+def parse_usgs_json(obj: Any) -> List[Tuple[Any, ...]]:
     """
     Accept:
       - A single Feature (dict with type="Feature")
       - A FeatureCollection (dict with type="FeatureCollection" and features=[...])
       - A list of Feature objects
-    Return: list of normalized rows with the modeling-focused columns.
+    Return: list of normalized row tuples, ordered like COLUMNS.
     """
     features: List[Dict[str, Any]] = []
 
@@ -62,7 +73,7 @@ def parse_usgs_json(obj: Any) -> List[Dict[str, Any]]:
     else:
         raise ValueError("Unsupported JSON root type (expect dict or list).")
 
-    rows: List[Dict[str, Any]] = []
+    rows: List[Tuple[Any, ...]] = []
 
     for f in features:
         props = f.get("properties") or {}
@@ -74,23 +85,22 @@ def parse_usgs_json(obj: Any) -> List[Dict[str, Any]]:
         lat = coords[1] if len(coords) > 1 else None
         depth = coords[2] if len(coords) > 2 else None
 
-        row = {
-            "id": f.get("id") or props.get("code") or None,
-            "time": props.get("time"),
-            "latitude": lat,
-            "longitude": lon,
-            "depth": depth,
-            "mag": props.get("mag"),
-            "magType": props.get("magType"),
-            "sig": props.get("sig"),
-            "gap": props.get("gap"),
-            "rms": props.get("rms"),
-            "nst": props.get("nst"),
-            "status": props.get("status"),
-            "type": props.get("type"),
-        }
-
-        rows.append(row)
+        get = props.get
+        rows.append((
+            f.get("id") or get("code") or None,
+            get("time"),
+            lat,
+            lon,
+            depth,
+            get("mag"),
+            get("magType"),
+            get("sig"),
+            get("gap"),
+            get("rms"),
+            get("nst"),
+            get("status"),
+            get("type"),
+        ))
 
     return rows
 
@@ -172,11 +182,11 @@ def filter_invalid(df: pd.DataFrame) -> pd.DataFrame:
 
 
 def preprocess(input_path: Path) -> pd.DataFrame:
-    with input_path.open("r", encoding="utf-8") as f:
-        obj = json.load(f)
+    with input_path.open("rb") as f:
+        obj = orjson.loads(f.read())
 
     rows = parse_usgs_json(obj)
-    df = pd.DataFrame(rows, columns=COLUMNS)
+    df = pd.DataFrame.from_records(rows, columns=COLUMNS)
 
     df = coerce_types(df)
 
@@ -194,32 +204,66 @@ def preprocess(input_path: Path) -> pd.DataFrame:
     return df
 
 
-def process_year_batch(year_dir: Path, show_progress: bool = True) -> Tuple[pd.DataFrame, int]:
+def list_json_files(year_dir: Path) -> List[str]:
+    """List JSON files of a year directory with os.scandir (no per-file stat)"""
+    with os.scandir(year_dir) as it:
+        return sorted(e.path for e in it
+                      if e.name.endswith(".json") and not e.name.startswith("."))
+
+
+def _parse_one(path: str) -> Optional[List[Tuple[Any, ...]]]:
+    """Worker: parse one JSON file into row tuples, None if it cannot be read"""
+    try:
+        with open(path, 'rb') as f:
+            return parse_usgs_json(orjson.loads(f.read()))
+    except Exception:
+        return None
+
+
+def process_year_batch(year_dir: Path, show_progress: bool = True,
+                       executor: Optional[Executor] = None,
+                       json_files: Optional[List[str]] = None) -> Tuple[pd.DataFrame, int]:
     """Process all JSON files from a single year directory"""
-    json_files = sorted(year_dir.glob("*.json"))
+    if json_files is None:
+        json_files = list_json_files(year_dir)
+
+    if executor is None:
+        with ProcessPoolExecutor(max_workers=os.cpu_count()) as pool:
+            return process_year_batch(year_dir, show_progress, pool, json_files)
 
     all_rows = []
     errors = 0
 
-    iterator = tqdm(json_files, desc=f"  Loading {year_dir.name}",
-                    unit="file", leave=False) if show_progress else json_files
+    results = executor.map(_parse_one, json_files, chunksize=PARSE_CHUNKSIZE)
+    iterator = tqdm(results, total=len(json_files), desc=f"  Loading {year_dir.name}",
+                    unit="file", leave=False) if show_progress else results
 
-    for json_file in iterator:
-        try:
-            with open(json_file, 'r', encoding='utf-8') as f:
-                feature = json.load(f)
-                rows = parse_usgs_json(feature)
-                all_rows.extend(rows)
-        except Exception:
+    for rows in iterator:
+        if rows is None:
             errors += 1
+        else:
+            all_rows.extend(rows)
 
     if not all_rows:
         return pd.DataFrame(columns=COLUMNS), errors
 
-    df = pd.DataFrame(all_rows, columns=COLUMNS)
+    df = pd.DataFrame.from_records(all_rows, columns=COLUMNS)
     return df, errors
 
 
+def write_output(df: pd.DataFrame, output_path: Path) -> None:
+    """Write CSV, or Parquet when the output path ends in .parquet"""
+    if output_path.parent != Path("."):
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+
+    if output_path.suffix.lower() == ".parquet":
+        df.to_parquet(output_path, index=False,
+                      compression=PARQUET_COMPRESSION)
+    else:
+        df.to_csv(output_path, index=False,
+                  lineterminator="\n", chunksize=CSV_CHUNKSIZE)
+
+
 def process_batch_mode(data_root: Path, output_path: Path, show_progress: bool = True):
     """Process all years in batch mode with progress tracking"""
     start_time = time.time()
@@ -244,27 +288,32 @@ def process_batch_mode(data_root: Path, output_path: Path, show_progress: bool =
     year_iterator = tqdm(year_dirs, desc="📅 Years",
                          unit="year") if show_progress else year_dirs
 
-    for year_dir in year_iterator:
-        year_start = time.time()
+    # One process pool shared by all years, JSON decode is CPU-bound
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+        for year_dir in year_iterator:
+            year_start = time.time()
 
-        json_files = list(year_dir.glob("*.json"))
-        file_count = len(json_files)
-        total_files += file_count
+            json_files = list_json_files(year_dir)
+            file_count = len(json_files)
+            total_files += file_count
 
-        if not show_progress:
-            print(f"🔄 Processing {year_dir.name}... ({file_count:,} files)")
+            if not show_progress:
+                print(f"🔄 Processing {year_dir.name}... ({file_count:,} files)")
 
-        df, errors = process_year_batch(year_dir, show_progress)
-        total_errors += errors
+            df, errors = process_year_batch(
+                year_dir, show_progress, executor, json_files)
+            total_errors += errors
 
-        if errors > 0 and not show_progress:
-            print(f"   ⚠️  {errors} files had errors")
+            if errors > 0 and not show_progress:
+                print(f"   ⚠️  {errors} files had errors")
 
-        if not df.empty:
-            all_dfs.append(df)
-            if not show_progress:
-                year_elapsed = time.time() - year_start
-                print(f"   ✅ Loaded {len(df):,} events in {year_elapsed:.1f}s")
+            if not df.empty:
+                # Coerce per year so the combined frame is built from typed
+                # (float / Int64 / Arrow-backed string) columns, not object columns
+                all_dfs.append(coerce_types(df))
+                if not show_progress:
+                    year_elapsed = time.time() - year_start
+                    print(f"   ✅ Loaded {len(df):,} events in {year_elapsed:.1f}s")
 
     if show_progress:
         print()
@@ -280,9 +329,6 @@ def process_batch_mode(data_root: Path, output_path: Path, show_progress: bool =
     # Apply preprocessing steps
     print("\n🔄 Applying preprocessing pipeline...")
 
-    print("   - Converting data types...")
-    df_combined = coerce_types(df_combined)
-
     print("   - Removing duplicates...")
     initial_count = len(df_combined)
     df_combined = df_combined.drop_duplicates(subset=["id"], keep="last")
@@ -308,11 +354,7 @@ def process_batch_mode(data_root: Path, output_path: Path, show_progress: bool =
     # Save to output
     print(f"\n💾 Saving to {output_path}...")
 
-    # Create parent directory if it doesn't exist
-    if output_path.parent != Path("."):
-        output_path.parent.mkdir(parents=True, exist_ok=True)
-
-    df_combined.to_csv(output_path, index=False)
+    write_output(df_combined, output_path)
 
     # Summary
     elapsed = time.time() - start_time
@@ -361,6 +403,9 @@ Examples:
   # Batch mode: process entire data/ directory (2000-2026)
   python preprocess_usgs_quakes.py --batch --data-dir data --output earthquake_cleaned.csv
   
+  # Batch mode writing Parquet instead of CSV
+  python preprocess_usgs_quakes.py --batch --data-dir data -o earthquake_cleaned.parquet
+
   # Batch mode without progress bar
   python preprocess_usgs_quakes.py --batch --data-dir data -o output.csv --no-progress
         """)
@@ -368,7 +413,7 @@ Examples:
     ap.add_argument("--input", "-i",
                     help="Path to input JSON (Feature or FeatureCollection). Use with single-file mode.")
     ap.add_argument("--output", "-o", required=True,
-                    help="Path to output CSV.")
+                    help="Path to output CSV (or .parquet for a compressed columnar file).")
     ap.add_argument("--batch", action="store_true",
                     help="Batch mode: process all JSON files from data directory.")
     ap.add_argument("--data-dir", default="data",
@@ -395,11 +440,7 @@ Examples:
 
         df = preprocess(input_path)
 
-        # Create parent directory if it doesn't exist
-        if output_path.parent != Path("."):
-            output_path.parent.mkdir(parents=True, exist_ok=True)
-
-        df.to_csv(output_path, index=False)
+        write_output(df, output_path)
 
         print(f"✅ Wrote {len(df):,} rows to {output_path}")
 